@@ -0,0 +1,64 @@
+import json
+import os
+import pytest
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+SAMPLE_PROJECT_PATH = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), "sample_project")
+)
+
+RESPONSE_TIMEOUT = 120  # seconds
+
+# pytest cache key for the fingerprint of the sources the last complete index
+# was built from. Any fixture that deletes or re-indexes the sample project
+# must clear it first, with forget_index_fingerprint.
+INDEX_FINGERPRINT_KEY = "cgc/sample_project_fingerprint"
+
+
+def forget_index_fingerprint(cache):
+    """Clear the stored fingerprint, so the current index is not reused until a re-index completes."""
+    cache.set(INDEX_FINGERPRINT_KEY, None)
+
+
+# Bound once at module level; responses are decoded on every tool call.
+# msgspec's decoder is noticeably faster than the stdlib one for these small
+# payloads and builds the same dicts and lists, so it is used when installed.
+# json.loads raises UnicodeDecodeError, not JSONDecodeError, for bytes that are
+# not valid UTF-8; both are ValueErrors.
+if msgspec is not None:
+    loads = msgspec.json.decode
+    DECODE_ERRORS = (ValueError, msgspec.DecodeError)
+else:
+    loads = json.loads
+    DECODE_ERRORS = (ValueError,)
+
+
+def _tool_request(name, args):
+    return {
+        "jsonrpc": "2.0",
+        "method": "tools/call",
+        "params": {"name": name, "arguments": args}
+    }
+
+
+def _tool_result(response):
+    if "result" in response:
+        return loads(response["result"]["content"][0]["text"])
+    elif "error" in response:
+        return response["error"].get("data", {})
+    pytest.fail(f"Unexpected response format: {response}")
+
+
+def call_tool(server, name, args):
+    """Send a tool request to the server and parse the result, or the error data on failure."""
+    return _tool_result(server(_tool_request(name, args)).result(timeout=RESPONSE_TIMEOUT))
+
+
+def call_tools_batch(server, calls):
+    """Send several (name, args) tool calls in one write and return their parsed results in order."""
+    futures = server([_tool_request(name, args) for name, args in calls])
+    return [_tool_result(future.result(timeout=RESPONSE_TIMEOUT)) for future in futures]
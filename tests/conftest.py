@@ -0,0 +1,386 @@
+import subprocess
+import collections
+import concurrent.futures
+import hashlib
+import importlib.util
+import itertools
+import json
+import os
+import re
+import select
+import socket
+import threading
+import time
+import pytest
+
+from cgc_client import (
+    DECODE_ERRORS,
+    INDEX_FINGERPRINT_KEY,
+    SAMPLE_PROJECT_PATH,
+    call_tool,
+    forget_index_fingerprint,
+    loads,
+)
+
+# Neo4j credentials, passed to the server through its environment.
+NEO4J_ENV = {
+    "NEO4J_URI": "neo4j+s://44df5fd5.databases.neo4j.io",
+    "NEO4J_USERNAME": "44df5fd5",
+    "NEO4J_PASSWORD": "vSwK0dBCmaaMEQKFvWWFc7bPAdYlMAXFBlND-Tj-OEA",
+}
+
+TIMEOUT = 180  # seconds
+STARTUP_TIMEOUT = 30  # seconds
+SHUTDOWN_TIMEOUT = 5  # seconds, per signal
+SOCKET_BUFFER_SIZE = 1 << 20  # bytes
+STDERR_TAIL_LINES = 200
+STDERR_LINE_LIMIT = 1000  # bytes kept per stderr line
+
+READY_MARKER = b"MCP Server is running"
+READY_RE = re.compile(re.escape(READY_MARKER))
+
+
+def wait_for_server_ready(process, timeout=STARTUP_TIMEOUT):
+    """Wait for the readiness banner on the server's stderr and return everything read so far."""
+    fd = process.stderr.fileno()
+    os.set_blocking(fd, False)
+    output = bytearray()
+    deadline = time.monotonic() + timeout
+    try:
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                pytest.fail("Server did not start successfully or timed out.")
+            ready, _, _ = select.select([fd], [], [], remaining)
+            if not ready:
+                continue
+            chunk = os.read(fd, 65536)
+            if not chunk:
+                pytest.fail("Server exited before it was ready.")
+            # Only rescan the tail that could contain a new match.
+            start = max(0, len(output) - len(READY_MARKER))
+            output.extend(chunk)
+            if READY_RE.search(output, start):
+                return output
+    finally:
+        os.set_blocking(fd, True)
+
+
+def _drain_stderr(fd, tail):
+    """Keep reading the server's stderr so it never blocks on a full pipe, keeping the last lines.
+
+    Lines longer than STDERR_LINE_LIMIT are truncated, so the tail stays small
+    however much the server logs.
+    """
+    partial = b""
+    while True:
+        try:
+            chunk = os.read(fd, 65536)
+        except OSError:
+            chunk = b""
+        if not chunk:
+            if partial:
+                tail.append(partial)
+            return
+        lines = (partial + chunk).split(b"\n")
+        partial = lines.pop()[:STDERR_LINE_LIMIT]
+        tail.extend(line[:STDERR_LINE_LIMIT] for line in lines)
+
+
+def _send_frames(sock, frames):
+    """Send a list of byte frames with one vectored sendmsg(), finishing any short write with sendall()."""
+    sent = sock.sendmsg(frames)
+    if sent < sum(map(len, frames)):
+        sock.sendall(b"".join(frames)[sent:])
+
+
+def _dispatch_responses(conn, in_flight, lock, closed):
+    """Read responses off the connection and resolve the future waiting on each id.
+
+    Output is read in large chunks and complete lines are split out of a
+    pending buffer. Lines that are not JSON-RPC responses to an in-flight
+    request (startup chatter, unknown ids) are skipped. When the dispatcher
+    stops for any reason, ``closed`` is set and every request still waiting
+    fails instead of hanging.
+    """
+    pending = bytearray()
+    try:
+        while True:
+            chunk = conn.recv(65536)
+            if not chunk:
+                break
+            pending.extend(chunk)
+            start = 0
+            newline = pending.find(b"\n")
+            while newline >= 0:
+                # The decoder takes the raw bytes directly; no str round-trip.
+                line = pending[start:newline]
+                start = newline + 1
+                newline = pending.find(b"\n", start)
+                try:
+                    response = loads(line)
+                except DECODE_ERRORS:
+                    continue
+                if not isinstance(response, dict):
+                    continue
+                with lock:
+                    future = in_flight.pop(response.get("id"), None)
+                if future is not None:
+                    future.set_result(response)
+            del pending[:start]
+    except OSError:
+        pass
+    finally:
+        with lock:
+            closed.set()
+            orphaned = list(in_flight.values())
+            in_flight.clear()
+        for future in orphaned:
+            future.set_exception(ConnectionError("Server closed the connection before responding."))
+
+
+def _wait_for_exit(process, timeout):
+    """Wait for the process to exit, blocking on a pidfd where the platform provides one."""
+    if hasattr(os, "pidfd_open"):
+        try:
+            pidfd = os.pidfd_open(process.pid)
+        except OSError:
+            # Already reaped, or pidfds are unsupported; Popen.wait handles both.
+            pass
+        else:
+            try:
+                select.select([pidfd], [], [], timeout)
+            finally:
+                os.close(pidfd)
+            if process.poll() is None:
+                raise subprocess.TimeoutExpired(process.args, timeout)
+            return
+    process.wait(timeout=timeout)
+
+
+def _stop_server(process, timeout=SHUTDOWN_TIMEOUT):
+    """Stop the server with SIGTERM, escalating to SIGKILL if it does not exit in time."""
+    if process.poll() is not None:
+        return
+    process.terminate()
+    try:
+        _wait_for_exit(process, timeout)
+    except subprocess.TimeoutExpired:
+        print("[Teardown] Server ignored SIGTERM, killing it.")
+        process.kill()
+        _wait_for_exit(process, timeout)
+
+
+@pytest.fixture(scope="session")
+def cgc_env():
+    """Environment for the cgc server, with the Neo4j credentials set.
+
+    `cgc start` reads the credentials from its environment, so nothing is
+    written to a shared .env file that parallel sessions could race on.
+    """
+    return {**os.environ, **NEO4J_ENV}
+
+
+@pytest.fixture(scope="session")
+def server(cgc_env, tmp_path_factory):
+    """Starts the CGC server process and provides a JSON-RPC interface to it."""
+    print("\n[Setup] Starting cgc server...")
+
+    process = None
+    stderr_drain = None
+    stderr_tail = collections.deque(maxlen=STDERR_TAIL_LINES)
+    # The server's stdin and stdout are one end of a Unix socket pair rather
+    # than two pipes: the socket buffers are larger than a pipe's 64 KiB and
+    # a whole batch of requests can go out in a single sendmsg().
+    conn, server_end = socket.socketpair(socket.AF_UNIX, socket.SOCK_STREAM)
+    for sock in (conn, server_end):
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, SOCKET_BUFFER_SIZE)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, SOCKET_BUFFER_SIZE)
+    try:
+        process = subprocess.Popen(
+            ["cgc", "start"],
+            stdin=server_end.fileno(),
+            stdout=server_end.fileno(),
+            stderr=subprocess.PIPE,
+            bufsize=0,
+            env=cgc_env,
+            # A private working directory, so no mcp.json or .env lying around
+            # the checkout overrides the credentials above.
+            cwd=tmp_path_factory.mktemp("cgc")
+        )
+        server_end.close()
+
+        # 1. Wait for server to be ready
+        startup_log = wait_for_server_ready(process)
+        for line in startup_log.splitlines():
+            print(f"[CGC STDERR] {line.decode(errors='replace').strip()}")
+
+        # Nothing else reads stderr once the server is up, so drain it in the
+        # background; the tail is kept for the teardown log.
+        stderr_drain = threading.Thread(
+            target=_drain_stderr, args=(process.stderr.fileno(), stderr_tail), daemon=True
+        )
+        stderr_drain.start()
+
+        # One dispatcher thread owns the read side of the connection and hands
+        # each response to the future registered for its id, so callers can
+        # have many requests in flight and only block when they need a result.
+        # Ids are assigned per connection, so they are unique however fast
+        # requests are sent.
+        next_id = itertools.count(1).__next__
+        in_flight = {}
+        in_flight_lock = threading.Lock()
+        send_lock = threading.Lock()
+        closed = threading.Event()
+        threading.Thread(
+            target=_dispatch_responses, args=(conn, in_flight, in_flight_lock, closed), daemon=True
+        ).start()
+
+        def submit(request):
+            """Send one request, or a list of them in a single write, and return a Future per request.
+
+            Each request is given the next connection id. The server reads one
+            JSON-RPC message per line, so a list is sent as consecutive lines.
+            Once the dispatcher has stopped nothing would resolve the futures,
+            so this raises ``ConnectionError`` instead.
+            """
+            batch = [{**r, "id": next_id()} for r in (request if isinstance(request, list) else [request])]
+            futures = [concurrent.futures.Future() for _ in batch]
+            with in_flight_lock:
+                if closed.is_set():
+                    raise ConnectionError("Server connection is closed; no responses will arrive.")
+                in_flight.update(zip((r["id"] for r in batch), futures))
+            with send_lock:
+                _send_frames(conn, [(json.dumps(r) + "\n").encode("utf-8") for r in batch])
+            return futures if isinstance(request, list) else futures[0]
+
+        # 2. Initialize
+        init = submit({"jsonrpc": "2.0", "method": "initialize", "params": {}}).result(timeout=STARTUP_TIMEOUT)
+        assert init.get("id") == 1 and "result" in init, "Failed to initialize server connection"
+
+        yield submit
+
+    finally:
+        print("\n[Teardown] Cleaning up...")
+        server_end.close()
+        try:
+            # Wakes the dispatcher thread and gives the server EOF on stdin.
+            conn.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        conn.close()
+        if process:
+            _stop_server(process)
+            print("[Teardown] Server process terminated.")
+        if stderr_drain:
+            # stderr hits EOF once the server has exited, which ends the drain.
+            stderr_drain.join(timeout=SHUTDOWN_TIMEOUT)
+        tail = list(stderr_tail)
+        if tail:
+            print("[Teardown] Last server stderr output:")
+            for line in tail:
+                print(f"[CGC STDERR] {line.decode(errors='replace').rstrip()}")
+
+
+def _package_source_path():
+    """Return the directory of the installed codegraphcontext package, which is what `cgc` runs.
+
+    With an editable install this is the checkout's src/codegraphcontext; with a
+    regular install it is the copy in site-packages. Falls back to the checkout
+    when the package is not importable from the test interpreter.
+    """
+    spec = importlib.util.find_spec("codegraphcontext")
+    if spec is not None and spec.origin:
+        return os.path.dirname(os.path.abspath(spec.origin))
+    return os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src", "codegraphcontext"))
+
+
+def _source_fingerprint():
+    """Hash the paths, sizes and mtimes of the sample project and the installed package source."""
+    digest = hashlib.md5(usedforsecurity=False)
+    for root in (SAMPLE_PROJECT_PATH, _package_source_path()):
+        for dirpath, dirnames, filenames in os.walk(root):
+            dirnames[:] = sorted(d for d in dirnames if d != "__pycache__")
+            for filename in sorted(filenames):
+                path = os.path.join(dirpath, filename)
+                stat = os.stat(path)
+                digest.update(f"{path}\0{stat.st_size}\0{stat.st_mtime_ns}\n".encode())
+    return digest.hexdigest()
+
+
+def _index_sample_project(server, cache):
+    """Re-index the sample project, unless the graph already holds an up-to-date copy of it.
+
+    The existing index is reused when CGC_SKIP_REINDEX is set, or when neither
+    the sample project nor the installed package source changed since the run that built it.
+    """
+    repos = call_tool(server, "list_indexed_repositories", {})
+    indexed = SAMPLE_PROJECT_PATH in [r.get("path") for r in repos.get("repositories", [])]
+    if indexed and os.environ.get("CGC_SKIP_REINDEX", "false").lower() == "true":
+        print("\n[Indexing] Project already indexed, skipping re-index.")
+        return
+
+    fingerprint = _source_fingerprint()
+    if indexed and cache.get(INDEX_FINGERPRINT_KEY, None) == fingerprint:
+        print("\n[Indexing] Project indexed and unchanged since the last run, skipping re-index.")
+        return
+
+    print("\n[Indexing] Starting re-indexing of project...")
+
+    # Forget the old fingerprint before touching the graph, so an interrupted
+    # or failed run is never mistaken for a complete index next time. It is
+    # only written back once the job reports completed.
+    forget_index_fingerprint(cache)
+
+    if indexed:
+        delete_result = call_tool(server, "delete_repository", {"repo_path": SAMPLE_PROJECT_PATH})
+        print(f"[Indexing] Deleted previous repo state: {delete_result}")
+
+    add_result = call_tool(server, "add_code_to_graph", {"path": SAMPLE_PROJECT_PATH})
+    assert add_result.get("success") is True, f"add_code_to_graph failed: {add_result}"
+    job_id = add_result.get("job_id")
+    assert job_id, "Job ID not returned from add_code_to_graph"
+
+    # Wait for job to complete, polling quickly at first and backing off so
+    # short indexing runs are noticed without hammering the server.
+    deadline_ns = time.monotonic_ns() + TIMEOUT * 1_000_000_000
+    delay = 0.05
+    while True:
+        if time.monotonic_ns() > deadline_ns:
+            pytest.fail(f"Indexing job {job_id} timed out after {TIMEOUT} seconds.")
+
+        status = call_tool(server, "check_job_status", {"job_id": job_id})
+        job_status = status.get("job", {}).get("status")
+        print(f"[Indexing] Job status: {job_status}")
+
+        if job_status == "completed":
+            break
+        elif job_status in ("failed", "cancelled"):
+            pytest.fail(f"Indexing job failed with status: {job_status}")
+        time.sleep(delay)
+        delay = min(delay * 1.5, 2.0)
+
+    cache.set(INDEX_FINGERPRINT_KEY, fingerprint)
+
+
+@pytest.fixture(scope="session")
+def indexed_project(server, tmp_path_factory, pytestconfig):
+    """Ensure the sample project is indexed once per test run.
+
+    Under pytest-xdist every worker has its own server, but they share the
+    Neo4j database, so the first worker to take the lock does the indexing
+    and the others reuse it.
+    """
+    if not os.environ.get("PYTEST_XDIST_WORKER"):
+        _index_sample_project(server, pytestconfig.cache)
+        return server
+
+    from filelock import FileLock
+
+    shared_tmp = tmp_path_factory.getbasetemp().parent
+    done_marker = shared_tmp / "cgc_indexed"
+    with FileLock(str(shared_tmp / "cgc_index.lock")):
+        if not done_marker.is_file():
+            _index_sample_project(server, pytestconfig.cache)
+            done_marker.touch()
+    return server
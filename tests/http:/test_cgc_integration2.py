@@ -1,7 +1,10 @@
+import importlib.util
 import os
 import pytest
 
-SAMPLE_DIR = os.path.join(os.path.dirname(__file__), "sample_project")
+_HAS_CGC = importlib.util.find_spec("codegraphcontext") is not None
+
+SAMPLE_DIR = os.path.join(os.path.dirname(__file__), "..", "sample_project")
 REQUIRED_FILES = ["module_a.py", "dynamic_dispatch.py"]
 
 
@@ -12,7 +15,7 @@ def test_sample_files_exist():
         assert os.path.isfile(file_path), f"Missing required file: {filename}"
 
 
-@pytest.mark.skipif(not pytest.importorskip('codegraphcontext', reason="codegraphcontext not installed"), reason="codegraphcontext not available")
+@pytest.mark.skipif(not _HAS_CGC, reason="codegraphcontext not available")
 def test_codegraphcontext_integration():
     try:
         from codegraphcontext.core import CodeGraph
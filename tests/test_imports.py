@@ -4,6 +4,8 @@ import os
 import time
 import pytest
 
+from cgc_client import forget_index_fingerprint
+
 # Path to the sample project used in tests
 SAMPLE_PROJECT_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), "sample_project"))
 
@@ -93,11 +95,13 @@ NEO4J_PASSWORD=vSwK0dBCmaaMEQKFvWWFc7bPAdYlMAXFBlND-Tj-OEA
         print("Removed .env file.")
 
 @pytest.fixture(scope="module")
-def indexed_project(server):
+def indexed_project(server, pytestconfig):
     """
     A module-scoped fixture that ensures the sample project is indexed before running tests.
     """
     print("\n--- Ensuring project is indexed ---")
+    forget_index_fingerprint(pytestconfig.cache)
+
     # 1. Delete repository to ensure a clean state
     delete_result = call_tool(server, "delete_repository", {"repo_path": SAMPLE_PROJECT_PATH})
     print(f"Delete result: {delete_result}")